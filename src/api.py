@@ -1,17 +1,61 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Optional
-from pipeline import step1_entity_recognition, step2_get_subgraph, step3_qa_with_llm
-from path_visualizer import visualize_paths_with_graphviz
+from typing import List, Optional, Tuple
+from pipeline import astep1_entity_recognition, astep2_get_subgraph, astep3_qa_with_llm
+from path_visualizer import render_paths_png
 from query_logger import get_query_logger
-import io
+from qa_batcher import get_qa_batcher
+from llm_call import get_llm_service
+from shared_cache import get_redis, close_redis
+import os
 import base64
+import hashlib
 import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+
+# 参考路径超过该数量时跳过可视化，避免大图渲染拖慢尾延迟
+MAX_VISUALIZATION_PATHS = 30
+
+# 渲染结果只取决于路径本身：进程内按路径元组做 LRU 缓存（仅在事件循环线程中访问）
+VISUALIZATION_CACHE_SIZE = 256
+_visualization_cache: "OrderedDict[Tuple[str, ...], str]" = OrderedDict()
+
+# 配置 REDIS_URL 时，渲染结果在 worker 之间共享的有效期（秒）
+VISUALIZATION_CACHE_TTL = 24 * 3600
+
+# Graphviz 渲染专用线程池：dot 以子进程运行，线程仅等待其输出；
+# 与默认线程池隔离，避免渲染占满 Neo4j 查询所用的线程
+_render_executor: Optional[ThreadPoolExecutor] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _render_executor
+    _render_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="graphviz")
+    # 预先创建 ChatOpenAI 与 HTTP 连接池，首个请求无需承担客户端初始化开销
+    get_llm_service().warm_up()
+    # 启动日志批量写入与问答微批处理的后台协程，关闭时写完剩余日志、等待在途批次完成
+    query_logger = get_query_logger()
+    query_logger.start()
+    batcher = get_qa_batcher()
+    batcher.start()
+    yield
+    await batcher.stop()
+    await query_logger.stop()
+    await close_redis()
+    _render_executor.shutdown(wait=True)
+    _render_executor = None
 
 app = FastAPI(
     title="Knowledge Graph API",
     description="API for interacting with the Knowledge Graph",
     version="1.0.0",
+    lifespan=lifespan,
+    # visualization_base64 可达数百 KB，orjson 序列化长字符串明显快于标准库 json
+    default_response_class=ORJSONResponse,
 )
 
 class QueryRequest(BaseModel):
@@ -25,11 +69,58 @@ class QueryResponse(BaseModel):
     referenced_paths: Optional[List[str]] = []
     visualization_base64: Optional[str] = None  # Base64 编码的可视化图片
 
+def _render_b64(referenced_paths: Tuple[str, ...]) -> str:
+    """生成参考路径的可视化图片并转换为 base64（同步，需在线程中调用）"""
+    return base64.b64encode(render_paths_png(list(referenced_paths))).decode('utf-8')
+
+def _cache_visualization(key: Tuple[str, ...], visualization_base64: str) -> None:
+    _visualization_cache[key] = visualization_base64
+    _visualization_cache.move_to_end(key)
+    while len(_visualization_cache) > VISUALIZATION_CACHE_SIZE:
+        _visualization_cache.popitem(last=False)
+
+async def _render_visualization(referenced_paths: List[str]) -> Optional[str]:
+    key = tuple(referenced_paths)
+    if len(key) > MAX_VISUALIZATION_PATHS:
+        return None
+
+    # L1：进程内缓存，命中时不访问 Redis
+    visualization_base64 = _visualization_cache.get(key)
+    if visualization_base64 is not None:
+        _visualization_cache.move_to_end(key)
+        return visualization_base64
+
+    # L2：多 worker 部署时查 Redis 中其他 worker 的渲染结果；Redis 不可用时直接渲染
+    redis = get_redis()
+    redis_key = None
+    if redis is not None:
+        redis_key = "viz:" + hashlib.sha256("\n".join(key).encode("utf-8")).hexdigest()
+        try:
+            cached = await redis.get(redis_key)
+            if cached:
+                visualization_base64 = cached.decode('utf-8')
+                _cache_visualization(key, visualization_base64)
+                return visualization_base64
+        except Exception:
+            redis_key = None
+
+    loop = asyncio.get_running_loop()
+    visualization_base64 = await loop.run_in_executor(_render_executor, _render_b64, key)
+    _cache_visualization(key, visualization_base64)
+
+    # 仅在本 worker 实际渲染后写入 Redis
+    if redis_key is not None:
+        try:
+            await redis.setex(redis_key, VISUALIZATION_CACHE_TTL, visualization_base64)
+        except Exception:
+            pass
+    return visualization_base64
+
 @app.post("/query", response_model=QueryResponse)
 async def query_endpoint(request: QueryRequest):
     """
     Receives a query and returns the center entity, paths, and answer.
-    All query information is logged to files.
+    All query information is logged to files by a background writer.
     """
     start_time = time.time()
     logger = get_query_logger()
@@ -37,7 +128,7 @@ async def query_endpoint(request: QueryRequest):
 
     try:
         # Step 1: Entity Recognition
-        center_entity = step1_entity_recognition(request.query, graph_id=request.graph_id)
+        center_entity = await astep1_entity_recognition(request.query, graph_id=request.graph_id)
 
         if not center_entity:
             answer = "无法识别到您问题中的实体，请换个问题试试。"
@@ -56,23 +147,18 @@ async def query_endpoint(request: QueryRequest):
             return QueryResponse(center_entity=None, paths=None, answer=answer)
 
         # Step 2: Get Subgraph
-        paths = step2_get_subgraph(center_entity, graph_id=request.graph_id)
+        paths = await astep2_get_subgraph(center_entity, graph_id=request.graph_id)
 
         # Step 3: QA with LLM
-        qa_result = step3_qa_with_llm(request.query, str(paths))
+        qa_result = await astep3_qa_with_llm(request.query, paths, center_entity=center_entity)
 
         # Step 4: 生成参考路径的可视化图片
         visualization_base64 = None
         referenced_paths = qa_result.get('referenced_paths', [])
         if referenced_paths:
             try:
-                # 生成可视化图片
-                img = visualize_paths_with_graphviz(referenced_paths)
-                # 转换为 base64
-                buf = io.BytesIO()
-                img.save(buf, format='PNG')
-                buf.seek(0)
-                visualization_base64 = base64.b64encode(buf.read()).decode('utf-8')
+                # Graphviz 渲染较慢，放到渲染线程池中执行以免阻塞事件循环
+                visualization_base64 = await _render_visualization(referenced_paths)
             except Exception as viz_error:
                 # 图片生成失败时不影响主流程，只记录错误
                 logger.log_query(
@@ -8,6 +8,9 @@
         --graph-id "643b6cd8-0664-46b2-8a1c-175585c48161" \
         --out outputs/qa_samples.jsonl
 
+已生成的问答对按 (实体名称, 路径集合) 缓存在 cache/qa_samples 目录下，
+重跑时子图未变化的实体直接复用结果；使用 --no-cache 可强制重新生成。
+
 环境依赖：
 - 需要在 .env 或环境变量中配置 Neo4j 连接参数：NEO4J_URI/NEO4J_USER/NEO4J_PASSWORD
 - 需要配置 OpenAI 相关：OPENAI_API_KEY（以及可选的 OPENAI_API_BASE_URL）
@@ -15,11 +18,15 @@
 
 import os
 import json
+import asyncio
+import hashlib
 import argparse
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 from neo4j_server import get_neo4j_service
-from llm_call import LLMCallService
+from llm_call import get_llm_service
+from prompts import format_paths
+from langchain_core.prompts import PromptTemplate
 from pydantic import BaseModel
 
 
@@ -61,61 +68,144 @@ def _find_question_entities(neo4j_service, label: str | None = None, type_values
     return results
 
 
-def _build_paths(neo4j_service, name: str, depth: int = 2) -> List[str]:
-    """生成以实体名称为中心的子图路径字符串列表，仅保留两跳路径。"""
-    paths = neo4j_service.get_format_subgraph_paths(name, depth=depth)
+def _filter_two_hop(paths: List[str]) -> List[str]:
     # 两跳路径示例：A->rel->B->rel->C，包含至少 4 个 "->"
     return [p for p in paths if p.count("->") >= 4]
 
 
+def _build_paths(neo4j_service, name: str, depth: int = 2) -> List[str]:
+    """生成以实体名称为中心的子图路径字符串列表，仅保留两跳路径。"""
+    return _filter_two_hop(neo4j_service.get_format_subgraph_paths(name, depth=depth))
+
+
+def _find_question_entity_paths(neo4j_service, label: str | None = None, type_values: List[str] = None,
+                                limit: int | None = None, depth: int = 2) -> List[Tuple[Dict[str, Any], Optional[List[str]]]]:
+    """一次 Cypher 查询取回问题实体及其两跳路径，返回 [(实体, 路径列表)]。
+    若按类型/标签未匹配到实体，则回退到 _find_question_entities 的问句名称识别，
+    此时路径为 None，需逐个实体调用 _build_paths 获取。
+    """
+    type_values = type_values or ["问题", "Question", "question"]
+    pairs = neo4j_service.fetch_question_entity_paths(
+        type_values, label=label, depth=depth, limit=1000 if limit is None else max(0, int(limit))
+    )
+    if pairs:
+        return [(e, _filter_two_hop(paths)) for e, paths in pairs]
+
+    candidates = _find_question_entities(neo4j_service, label=label, type_values=type_values)
+    if limit is not None:
+        candidates = candidates[:max(0, int(limit))]
+    return [(e, None) for e in candidates]
+
+
 class QASchema(BaseModel):
     question: str
     answer: str
 
 
-def _gen_qa_two_hop(entity_name: str, paths: List[str]) -> Dict[str, str]:
-    """调用大模型生成基于两跳路径的问答对，返回 {question, answer}。"""
-    service = LLMCallService()
-    # 强调两跳路径与答案长度，答案不少于 40 字、不超过 120 字；不披露路径本身
-    prompt = (
-        "你将基于一个知识图谱中的实体与两跳推理路径，生成一个中文问答对。\n"
-        "要求：\n"
-        "1) 问题围绕该实体，体现两跳推理的因果或影响关系，长度不超过 25 个汉字；\n"
-        "2) 答案应基于两跳路径的信息进行归纳，1-2 句话，40-120 个汉字；\n"
-        "3) 答案不要直接描述‘根据路径’或‘两跳’等字眼，不披露路径来源；\n"
-        "4) 不要编造，无法确定时给出客观说明。\n\n"
-        f"实体名称：{entity_name}\n"
-        f"两跳路径列表：{paths}\n"
-        "请仅输出 JSON：{\"question\": <问题>, \"answer\": <答案>}"
-    )
+# 强调两跳路径与答案长度，答案不少于 40 字、不超过 120 字；不披露路径本身
+_QA_PROMPT = PromptTemplate.from_template(
+    "你将基于一个知识图谱中的实体与两跳推理路径，生成一个中文问答对。\n"
+    "要求：\n"
+    "1) 问题围绕该实体，体现两跳推理的因果或影响关系，长度不超过 25 个汉字；\n"
+    "2) 答案应基于两跳路径的信息进行归纳，1-2 句话，40-120 个汉字；\n"
+    "3) 答案不要直接描述‘根据路径’或‘两跳’等字眼，不披露路径来源；\n"
+    "4) 不要编造，无法确定时给出客观说明。\n\n"
+    "实体名称：{name}\n"
+    "两跳路径列表：\n{paths}"
+)
+
+
+DEFAULT_CACHE_DIR = os.path.join("cache", "qa_samples")
+
+
+def _qa_cache_key(entity_name: str, paths: List[str]) -> str:
+    return hashlib.sha256((entity_name + "|" + "\n".join(sorted(paths))).encode("utf-8")).hexdigest()
 
-    res = service.call_llm_json(prompt=prompt, json_schema=QASchema)
-    if res.get("status") == "success" and "json_content" in res:
-        return res["json_content"]
-    # 回退：若解析失败，采用保守生成
-    return {"question": f"{entity_name}的两跳影响是什么？", "answer": f"与{entity_name}相关的两跳影响需结合现场路径信息判断。"}
 
+def _load_cached_qa(cache_dir: str, key: str) -> Dict[str, str] | None:
+    try:
+        with open(os.path.join(cache_dir, f"{key}.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
 
-def generate_samples(graph_id: str, out_path: str, label: str = None, type_value: str = "问题", limit: int = None) -> None:
-    """核心流程：抓取实体 -> 构造路径 -> 生成简短问答 -> 写入 JSON（数组）。"""
+
+def _save_cached_qa(cache_dir: str, key: str, qa: Dict[str, str]) -> None:
+    # 先写临时文件再替换，避免中断时留下不完整的缓存
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{key}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(qa, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+async def _gen_qa_two_hop(entity_name: str, paths: List[str], cache_dir: str | None = None) -> Dict[str, str] | None:
+    """调用大模型生成基于两跳路径的问答对，返回 {question, answer}；生成失败时返回 None。
+    使用模型原生结构化输出，输出格式由 QASchema 约束。
+    指定 cache_dir 时优先读取磁盘缓存，仅缓存大模型成功生成的结果。
+    """
+    key = None
+    if cache_dir:
+        key = _qa_cache_key(entity_name, paths)
+        cached = _load_cached_qa(cache_dir, key)
+        if cached is not None:
+            return cached
+
+    service = get_llm_service()
+    prompt = _QA_PROMPT.format(name=entity_name, paths=format_paths(paths))
+
+    res = await service.acall_llm_structured(prompt=prompt, schema=QASchema)
+    if res.get("status") != "success":
+        print(f"问答生成失败，跳过实体 {entity_name}: {res.get('error')}")
+        return None
+    if key is not None:
+        _save_cached_qa(cache_dir, key, res["json_content"])
+    return res["json_content"]
+
+
+async def generate_samples_async(graph_id: str, out_path: str, label: str = None, type_value: str = "问题",
+                                 limit: int = None, concurrency: int = 8,
+                                 cache_dir: str | None = DEFAULT_CACHE_DIR) -> None:
+    """核心流程：抓取实体 -> 构造路径 -> 生成简短问答 -> 逐行写入 JSONL。
+
+    各实体之间相互独立，使用信号量限制并发数，重叠 Neo4j 查询与 LLM 调用的网络等待。
+    每生成一个样本立即写入并刷新，内存占用恒定，中途失败也保留已完成的样本。
+    """
     neo4j_service = get_neo4j_service(graph_id=graph_id)
 
-    candidates = _find_question_entities(neo4j_service, label=label, type_values=[type_value])
-    if limit is not None:
-        candidates = candidates[:max(0, int(limit))]
+    candidates = await asyncio.to_thread(
+        _find_question_entity_paths, neo4j_service, label, [type_value], limit, 2
+    )
 
     out_dir = os.path.dirname(out_path)
     if out_dir:
         os.makedirs(out_dir, exist_ok=True)
 
-    samples: List[Dict[str, Any]] = []
-    for e in candidates:
+    semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+    count = 0
+
+    async def bound(coro):
+        async with semaphore:
+            return await coro
+
+    async def process(e: Dict[str, Any], paths: Optional[List[str]], f) -> None:
+        nonlocal count
         name = e.get("name")
         if not name:
-            continue
+            return
 
-        paths = _build_paths(neo4j_service, name, depth=2)
-        qa = _gen_qa_two_hop(name, paths)
+        # 单个实体的失败（Neo4j 查询、缓存写入等）只跳过该实体，不中断整个导出
+        try:
+            if paths is None:
+                # Neo4j 驱动为同步接口，放到线程中执行以免阻塞事件循环
+                paths = await asyncio.to_thread(_build_paths, neo4j_service, name, 2)
+            qa = await _gen_qa_two_hop(name, paths, cache_dir=cache_dir)
+        except Exception as ex:
+            print(f"处理实体失败，跳过实体 {name}: {ex}")
+            return
+        if qa is None:
+            return
         sample = {
             "graph_id": graph_id,
             "question_entity_id": e.get("id"),
@@ -124,31 +214,54 @@ def generate_samples(graph_id: str, out_path: str, label: str = None, type_value
             "question": qa.get("question", ""),
             "answer": qa.get("answer", ""),
         }
-        samples.append(sample)
+        # 所有协程运行在同一事件循环线程中，同步写入单行不会交错
+        f.write(json.dumps(sample, ensure_ascii=False) + "\n")
+        f.flush()
+        count += 1
 
-    # 写入 JSON 数组
+    # 写入 JSONL（一行一个样本，按完成顺序写入）
     with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(samples, f, ensure_ascii=False, indent=2)
+        await asyncio.gather(*(bound(process(e, paths, f)) for e, paths in candidates))
+
+    print(f"导出完成，共生成 {count} 条样本 -> {out_path}")
 
-    print(f"导出完成，共生成 {len(samples)} 条样本 -> {out_path}")
+
+def generate_samples(graph_id: str, out_path: str, label: str = None, type_value: str = "问题",
+                     limit: int = None, concurrency: int = 8,
+                     cache_dir: str | None = DEFAULT_CACHE_DIR) -> None:
+    """generate_samples_async 的同步入口。"""
+    asyncio.run(generate_samples_async(
+        graph_id=graph_id,
+        out_path=out_path,
+        label=label,
+        type_value=type_value,
+        limit=limit,
+        concurrency=concurrency,
+        cache_dir=cache_dir,
+    ))
 
 
 def main():
-    parser = argparse.ArgumentParser(description="导出类型为‘问题’实体的二跳子图问答样本（JSON 数组）")
+    parser = argparse.ArgumentParser(description="导出类型为‘问题’实体的二跳子图问答样本（JSONL）")
     parser.add_argument("--graph-id", required=True, help="目标图谱 graph_id")
-    parser.add_argument("--out", default="outputs/qa_samples.json", help="输出文件路径（JSON）")
+    parser.add_argument("--out", default="outputs/qa_samples.jsonl", help="输出文件路径（JSONL）")
     parser.add_argument("--label", default=None, help="实体节点的标签（默认 None，表示不限定标签）")
     parser.add_argument("--type", default="问题", help="用于过滤的实体类型（默认 ‘问题’）")
     parser.add_argument("--limit", type=int, default=None, help="可选：限制导出的实体数量上限")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发处理的实体数量（默认 8）")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="问答结果的磁盘缓存目录")
+    parser.add_argument("--no-cache", action="store_true", help="不读取也不写入磁盘缓存，强制重新生成")
 
     args = parser.parse_args()
-    generate_samples(
+    asyncio.run(generate_samples_async(
         graph_id=args.graph_id,
         out_path=args.out,
         label=args.label,
         type_value=args.type,
         limit=args.limit,
-    )
+        concurrency=args.concurrency,
+        cache_dir=None if args.no_cache else args.cache_dir,
+    ))
 
 
 if __name__ == "__main__":
@@ -2,7 +2,11 @@
 简化的大模型调用接口，使用 langchain 支持返回 JSON
 """
 import os
-from typing import Dict, Any, Optional
+import asyncio
+import weakref
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
+import httpx
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
@@ -12,15 +16,52 @@ from pydantic import BaseModel
 
 load_dotenv()
 
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=64, max_connections=128)
+
+def _build_llm(model_name: str, http_async_client: Optional[httpx.AsyncClient] = None) -> ChatOpenAI:
+    return ChatOpenAI(
+        model=model_name,
+        temperature=0.7,
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        openai_api_base=os.getenv("OPENAI_API_BASE_URL"),
+        http_client=_get_http_client(),
+        http_async_client=http_async_client
+    )
+
+@lru_cache(maxsize=1)
+def _get_http_client() -> httpx.Client:
+    """进程内共享的同步 HTTP 连接池（keep-alive），避免每次调用重新握手"""
+    return httpx.Client(limits=_HTTP_LIMITS)
+
+@lru_cache(maxsize=8)
+def _get_llm(model_name: str) -> ChatOpenAI:
+    """按模型名缓存用于同步调用的 ChatOpenAI 实例"""
+    return _build_llm(model_name)
+
+# httpx.AsyncClient 的连接池绑定在首次使用它的事件循环上，复用到其他循环（如多次 asyncio.run）会出错，
+# 因此异步调用使用的 ChatOpenAI 按事件循环分别缓存，事件循环被回收后对应条目自动释放
+_loop_llms: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Any, Any]]" = weakref.WeakKeyDictionary()
+
+def _get_async_llm(model_name: str, schema: Optional[type[BaseModel]] = None):
+    """获取当前事件循环下的 ChatOpenAI（指定 schema 时返回绑定结构化输出的模型）"""
+    llms = _loop_llms.setdefault(asyncio.get_running_loop(), {})
+    key = (model_name, schema)
+    if key not in llms:
+        if schema is None:
+            llms[key] = _build_llm(model_name, httpx.AsyncClient(limits=_HTTP_LIMITS))
+        else:
+            llms[key] = _get_async_llm(model_name).with_structured_output(schema)
+    return llms[key]
+
 class LLMCallService:
     def __init__(self, model_name: str = None):
         self.model_name = model_name or os.getenv("MODEL", "gpt-4o")
-        self.llm = ChatOpenAI(
-            model=self.model_name,
-            temperature=0.7,
-            openai_api_key=os.getenv("OPENAI_API_KEY"),
-            openai_api_base=os.getenv("OPENAI_API_BASE_URL")
-        )
+        self.llm = _get_llm(self.model_name)
+        self._structured_llms = {}
+
+    def warm_up(self) -> None:
+        """预先创建当前事件循环下的异步客户端与连接池"""
+        _get_async_llm(self.model_name)
     
     def call_llm(self, prompt: str, system_message: str = None) -> Dict[str, Any]:
         """简单的 LLM 调用"""
@@ -34,24 +75,46 @@ class LLMCallService:
             return {"status": "success", "content": response.content}
         except Exception as e:
             return {"status": "error", "error": str(e)}
-    
-    def call_llm_json(self, prompt: str, system_message: str = None, 
-                     json_schema: Optional[BaseModel] = None) -> Dict[str, Any]:
-        """调用 LLM 并返回 JSON 格式，使用 LangChain 的 JsonOutputParser"""
+
+    async def acall_llm(self, prompt: str, system_message: str = None) -> Dict[str, Any]:
+        """call_llm 的异步版本"""
         try:
-            # 创建 JSON 输出解析器
-            parser = JsonOutputParser(pydantic_object=json_schema) if json_schema else JsonOutputParser()
-            
-            # 构建消息列表
             messages = []
             if system_message:
                 messages.append(SystemMessage(content=system_message))
-            
-            # 添加格式说明到用户消息中
+            messages.append(HumanMessage(content=prompt))
+
+            response = await _get_async_llm(self.model_name).ainvoke(messages)
+            return {"status": "success", "content": response.content}
+        except Exception as e:
+            return {"status": "error", "error": str(e)}
+    
+    def _build_json_messages(self, prompt: str, system_message: str = None,
+                             json_schema: Optional[BaseModel] = None,
+                             format_instructions: Optional[str] = None):
+        """构建 JSON 调用所需的解析器与消息列表；传入预先生成的 format_instructions 可跳过 schema 格式化"""
+        # 创建 JSON 输出解析器
+        parser = JsonOutputParser(pydantic_object=json_schema) if json_schema else JsonOutputParser()
+
+        # 构建消息列表
+        messages = []
+        if system_message:
+            messages.append(SystemMessage(content=system_message))
+
+        # 添加格式说明到用户消息中
+        if format_instructions is None:
             format_instructions = parser.get_format_instructions()
-            full_prompt = f"{prompt}\n\n{format_instructions}"
-            messages.append(HumanMessage(content=full_prompt))
-            
+        full_prompt = f"{prompt}\n\n{format_instructions}"
+        messages.append(HumanMessage(content=full_prompt))
+        return parser, messages
+
+    def call_llm_json(self, prompt: str, system_message: str = None, 
+                     json_schema: Optional[BaseModel] = None,
+                     format_instructions: Optional[str] = None) -> Dict[str, Any]:
+        """调用 LLM 并返回 JSON 格式，使用 LangChain 的 JsonOutputParser"""
+        try:
+            parser, messages = self._build_json_messages(prompt, system_message, json_schema, format_instructions)
+
             # 调用模型并解析结果
             response = self.llm.invoke(messages)
             parsed_result = parser.parse(response.content)
@@ -60,7 +123,90 @@ class LLMCallService:
         except Exception as e:
             return {"status": "error", "error": str(e)}
 
+    async def acall_llm_json(self, prompt: str, system_message: str = None,
+                             json_schema: Optional[BaseModel] = None,
+                             format_instructions: Optional[str] = None) -> Dict[str, Any]:
+        """call_llm_json 的异步版本，使用 ainvoke 避免阻塞事件循环"""
+        try:
+            parser, messages = self._build_json_messages(prompt, system_message, json_schema, format_instructions)
+
+            response = await _get_async_llm(self.model_name).ainvoke(messages)
+            parsed_result = parser.parse(response.content)
+
+            return {"status": "success", "content": response.content, "json_content": parsed_result}
+        except Exception as e:
+            return {"status": "error", "error": str(e)}
+
+    def _get_structured_llm(self, schema: type[BaseModel]):
+        # 按 schema 缓存绑定了结构化输出的模型，避免每次调用重新构建
+        if schema not in self._structured_llms:
+            self._structured_llms[schema] = self.llm.with_structured_output(schema)
+        return self._structured_llms[schema]
+
+    def call_llm_structured(self, prompt: str, schema: type[BaseModel],
+                            system_message: str = None) -> Dict[str, Any]:
+        """使用模型原生结构化输出（json_schema）调用 LLM，无需在提示词中附加格式说明"""
+        try:
+            messages = []
+            if system_message:
+                messages.append(SystemMessage(content=system_message))
+            messages.append(HumanMessage(content=prompt))
+
+            result = self._get_structured_llm(schema).invoke(messages)
+            return {"status": "success", "json_content": result.model_dump()}
+        except Exception as e:
+            return {"status": "error", "error": str(e)}
+
+    async def acall_llm_structured(self, prompt: str, schema: type[BaseModel],
+                                   system_message: str = None) -> Dict[str, Any]:
+        """call_llm_structured 的异步版本"""
+        try:
+            messages = []
+            if system_message:
+                messages.append(SystemMessage(content=system_message))
+            messages.append(HumanMessage(content=prompt))
+
+            result = await _get_async_llm(self.model_name, schema).ainvoke(messages)
+            return {"status": "success", "json_content": result.model_dump()}
+        except Exception as e:
+            return {"status": "error", "error": str(e)}
+
+    async def abatch_llm_json(self, prompts: List[str], system_message: str = None,
+                              json_schema: Optional[BaseModel] = None) -> List[Dict[str, Any]]:
+        """批量调用 LLM 并返回 JSON 结果，单次 abatch 内并行发出请求，结果顺序与 prompts 一致"""
+        built = [self._build_json_messages(p, system_message, json_schema) for p in prompts]
+        try:
+            responses = await _get_async_llm(self.model_name).abatch([messages for _, messages in built], return_exceptions=True)
+        except Exception as e:
+            return [{"status": "error", "error": str(e)} for _ in prompts]
+
+        results = []
+        for (parser, _), response in zip(built, responses):
+            if isinstance(response, Exception):
+                results.append({"status": "error", "error": str(response)})
+                continue
+            try:
+                parsed_result = parser.parse(response.content)
+                results.append({"status": "success", "content": response.content, "json_content": parsed_result})
+            except Exception as e:
+                results.append({"status": "error", "error": str(e)})
+        return results
+
 # 便捷函数
+_default_service: Optional[LLMCallService] = None
+
+def get_llm_service() -> LLMCallService:
+    """获取默认模型的全局 LLMCallService 实例"""
+    global _default_service
+    if _default_service is None:
+        _default_service = LLMCallService()
+    return _default_service
+
 def quick_call(prompt: str, return_json: bool = False) -> Dict[str, Any]:
-    service = LLMCallService()
-    return service.call_llm_json(prompt) if return_json else service.call_llm(prompt)
\ No newline at end of file
+    service = get_llm_service()
+    return service.call_llm_json(prompt) if return_json else service.call_llm(prompt)
+
+async def aquick_call(prompt: str, return_json: bool = False) -> Dict[str, Any]:
+    """quick_call 的异步版本"""
+    service = get_llm_service()
+    return await service.acall_llm_json(prompt) if return_json else await service.acall_llm(prompt)
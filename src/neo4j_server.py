@@ -167,6 +167,74 @@ class Neo4jService:
         return connections
 
 
+    def _build_subgraph(self, paths, node_labels: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        将查询得到的路径对象合并为去重后的节点与边列表，并按节点标签过滤。
+        Returns:
+            (nodes_list, valid_edges)
+        """
+        nodes_map: Dict[str, Dict[str, Any]] = {}  # 使用element_id作为key
+        edges_map: Dict[str, Dict[str, Any]] = {}  # 使用element_id作为key
+        all_nodes_map: Dict[str, Dict[str, Any]] = {}  # 保存所有节点，用于边的完整性检查
+
+        for path in paths:
+            # 先收集所有节点（不过滤）
+            for node in path.nodes:
+                element_id = node.element_id
+                if element_id not in all_nodes_map:
+                    node_labels_list = list(node.labels)
+                    node_info = self._normalize_node(node_labels_list, dict(node), node.id)
+                    node_info["element_id"] = element_id
+                    all_nodes_map[element_id] = node_info
+                    
+                    # 如果指定了节点标签过滤，检查节点是否符合条件
+                    if node_labels is None or any(label in node_labels_list for label in node_labels):
+                        nodes_map[element_id] = node_info
+            
+            # 收集所有边
+            for rel in path.relationships:
+                rel_element_id = rel.element_id
+                if rel_element_id not in edges_map:
+                    start_node_id = rel.start_node.id
+                    end_node_id = rel.end_node.id
+                    start_element_id = rel.start_node.element_id
+                    end_element_id = rel.end_node.element_id
+                    
+                    edge_info = self._normalize_rel(rel, start_node_id, end_node_id)
+                    edge_info["element_id"] = rel_element_id
+                    edge_info["start_node_element_id"] = start_element_id  # 用于可视化连接
+                    edge_info["end_node_element_id"] = end_element_id      # 用于可视化连接
+                    edges_map[rel_element_id] = edge_info
+
+        # 确保返回的数据结构完整
+        nodes_list = list(nodes_map.values())
+        edges_list = list(edges_map.values())
+        
+        # 验证图结构完整性：只保留连接到过滤后节点的边
+        filtered_node_element_ids = {node["element_id"] for node in nodes_list}
+        valid_edges = []
+        
+        for edge in edges_list:
+            # 如果边的任意一端连接到过滤后的节点，就保留这条边
+            start_in_filtered = edge["start_node_element_id"] in filtered_node_element_ids
+            end_in_filtered = edge["end_node_element_id"] in filtered_node_element_ids
+            
+            if start_in_filtered or end_in_filtered:
+                valid_edges.append(edge)
+                
+                # 如果边的另一端节点不在过滤后的节点中，也要添加进来以保持图的完整性
+                if start_in_filtered and edge["end_node_element_id"] not in filtered_node_element_ids:
+                    if edge["end_node_element_id"] in all_nodes_map:
+                        nodes_list.append(all_nodes_map[edge["end_node_element_id"]])
+                        filtered_node_element_ids.add(edge["end_node_element_id"])
+                        
+                if end_in_filtered and edge["start_node_element_id"] not in filtered_node_element_ids:
+                    if edge["start_node_element_id"] in all_nodes_map:
+                        nodes_list.append(all_nodes_map[edge["start_node_element_id"]])
+                        filtered_node_element_ids.add(edge["start_node_element_id"])
+        
+        return nodes_list, valid_edges
+
     def get_subgraph(self,
                      name: str,
                      depth: int = 1,
@@ -202,70 +270,12 @@ class Neo4jService:
             f"MATCH p=(start){pattern}(m) WHERE m.graph_id = $graph_id RETURN p LIMIT $limit"
         )
 
-        nodes_map: Dict[str, Dict[str, Any]] = {}  # 使用element_id作为key
-        edges_map: Dict[str, Dict[str, Any]] = {}  # 使用element_id作为key
-        all_nodes_map: Dict[str, Dict[str, Any]] = {}  # 保存所有节点，用于边的完整性检查
-
         with self.driver.session() as session:
             result = session.run(cypher, name=name, limit=limit, graph_id=self.graph_id)
-            for record in result:
-                path = record["p"]
-                
-                # 先收集所有节点（不过滤）
-                for node in path.nodes:
-                    element_id = node.element_id
-                    if element_id not in all_nodes_map:
-                        node_labels_list = list(node.labels)
-                        node_info = self._normalize_node(node_labels_list, dict(node), node.id)
-                        node_info["element_id"] = element_id
-                        all_nodes_map[element_id] = node_info
-                        
-                        # 如果指定了节点标签过滤，检查节点是否符合条件
-                        if node_labels is None or any(label in node_labels_list for label in node_labels):
-                            nodes_map[element_id] = node_info
-                
-                # 收集所有边
-                for rel in path.relationships:
-                    rel_element_id = rel.element_id
-                    if rel_element_id not in edges_map:
-                        start_node_id = rel.start_node.id
-                        end_node_id = rel.end_node.id
-                        start_element_id = rel.start_node.element_id
-                        end_element_id = rel.end_node.element_id
-                        
-                        edge_info = self._normalize_rel(rel, start_node_id, end_node_id)
-                        edge_info["element_id"] = rel_element_id
-                        edge_info["start_node_element_id"] = start_element_id  # 用于可视化连接
-                        edge_info["end_node_element_id"] = end_element_id      # 用于可视化连接
-                        edges_map[rel_element_id] = edge_info
+            paths = [record["p"] for record in result]
+
+        nodes_list, valid_edges = self._build_subgraph(paths, node_labels)
 
-        # 确保返回的数据结构完整
-        nodes_list = list(nodes_map.values())
-        edges_list = list(edges_map.values())
-        
-        # 验证图结构完整性：只保留连接到过滤后节点的边
-        filtered_node_element_ids = {node["element_id"] for node in nodes_list}
-        valid_edges = []
-        
-        for edge in edges_list:
-            # 如果边的任意一端连接到过滤后的节点，就保留这条边
-            start_in_filtered = edge["start_node_element_id"] in filtered_node_element_ids
-            end_in_filtered = edge["end_node_element_id"] in filtered_node_element_ids
-            
-            if start_in_filtered or end_in_filtered:
-                valid_edges.append(edge)
-                
-                # 如果边的另一端节点不在过滤后的节点中，也要添加进来以保持图的完整性
-                if start_in_filtered and edge["end_node_element_id"] not in filtered_node_element_ids:
-                    if edge["end_node_element_id"] in all_nodes_map:
-                        nodes_list.append(all_nodes_map[edge["end_node_element_id"]])
-                        filtered_node_element_ids.add(edge["end_node_element_id"])
-                        
-                if end_in_filtered and edge["start_node_element_id"] not in filtered_node_element_ids:
-                    if edge["start_node_element_id"] in all_nodes_map:
-                        nodes_list.append(all_nodes_map[edge["start_node_element_id"]])
-                        filtered_node_element_ids.add(edge["start_node_element_id"])
-        
         return {
             "nodes": nodes_list,
             "edges": valid_edges,
@@ -285,10 +295,13 @@ class Neo4jService:
             direction="both",
             node_labels=['Entity']
         )
+        return self._format_paths(res_entity['nodes'], res_entity['edges'], init_entity)
+
+    @staticmethod
+    def _format_paths(nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]], init_entity: Optional[str] = None) -> List[str]:
+        """将子图的节点与边格式化为 "实体->关系->实体" 形式的路径字符串列表。"""
         ne = {}
         du = {}
-        nodes = res_entity['nodes']
-        edges = res_entity['edges']
         init_id = None 
 
         # 先构建这个实体element_id对应实体信息的map
@@ -339,6 +352,49 @@ class Neo4jService:
         # print(res_paths)
         return res_paths
 
+    def fetch_question_entity_paths(self,
+                                    type_values: List[str],
+                                    label: Optional[str] = None,
+                                    depth: int = 2,
+                                    limit: int = 1000,
+                                    path_limit: int = 1000) -> List[Tuple[Dict[str, Any], List[str]]]:
+        """
+        一次查询返回指定类型的实体及其多跳子图路径，避免逐个实体查询（N+1 次往返）。
+        实体类型取自 entity_type/type/类别/category 属性，或标签包含“问题/Question”。
+        Args:
+            type_values: 实体类型取值列表（大小写不敏感）
+            label: 仅匹配指定标签的节点（可选）
+            depth: 路径最大跳数（>=1）
+            limit: 返回实体数量上限
+            path_limit: 每个实体的路径数量上限
+        Returns:
+            [(实体, 格式化路径列表), ...]，实体结构同 list_entities
+        """
+        depth = max(1, int(depth))
+        match = f"MATCH (q:{label})" if label else "MATCH (q)"
+        cypher = (
+            f"{match} WHERE q.graph_id = $graph_id "
+            "AND (toLower(toString(coalesce(q.entity_type, q.type, q.`类别`, q.category))) IN $types "
+            "OR any(lb IN labels(q) WHERE lb IN ['问题', 'Question'])) "
+            "WITH q LIMIT $limit "
+            # 子查询内对每个实体单独 LIMIT，数据库展开到 path_limit 条路径即可停止
+            "CALL { WITH q "
+            f"OPTIONAL MATCH p=(q)-[*1..{depth}]-(m) WHERE m.graph_id = $graph_id "
+            "RETURN p LIMIT $path_limit } "
+            "WITH q, collect(p) AS paths "
+            "RETURN elementId(q) as id, labels(q) as labels, properties(q) as properties, paths"
+        )
+        types = [str(v).lower() for v in type_values]
+
+        results: List[Tuple[Dict[str, Any], List[str]]] = []
+        with self.driver.session() as session:
+            result = session.run(cypher, types=types, limit=limit, path_limit=path_limit, graph_id=self.graph_id)
+            # 逐条格式化，只保留路径字符串，不同时持有所有实体的原始路径对象
+            for record in result:
+                entity = self._normalize_node(record["labels"], record["properties"], record["id"])
+                nodes, edges = self._build_subgraph(record["paths"], node_labels=['Entity'])
+                results.append((entity, self._format_paths(nodes, edges, entity["name"])))
+        return results
 
 
     def close(self) -> None:
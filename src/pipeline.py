@@ -1,27 +1,20 @@
+import asyncio
+
 from prompts import *
 from neo4j_server import get_neo4j_service
-from llm_call import quick_call
+from llm_call import quick_call, aquick_call
 from query_logger import get_query_logger
+from qa_batcher import get_qa_batcher
+from qa_cache import get_qa_cache
 
-def step1_entity_recognition(query: str, graph_id: str = None):
-    """
-    Performs entity recognition on the given query.
-    """
+def _list_entity_map(graph_id: str = None):
     neo4j_service = get_neo4j_service(graph_id = graph_id)
     entities = neo4j_service.list_entities()
     
-    entity_map = {entity["name"]: {"id": entity["id"], "description": entity["description"]} 
+    return {entity["name"]: {"id": entity["id"], "description": entity["description"]} 
         for entity in entities if "Entity" in entity["labels"]}
 
-    from prompts import get_llm_re_entity_prompt
-
-    prompt = get_llm_re_entity_prompt(query, entity_map.keys())
-
-    llm_res = quick_call(prompt, return_json=True)
-    
-    entity = None if llm_res['json_content']['entity'] == '' else llm_res['json_content']['entity']
-    
-    # 记录实体识别日志
+def _log_entity_recognition(query: str, entity_map: dict, entity, graph_id: str = None):
     try:
         logger = get_query_logger()
         logger.log_entity_recognition(
@@ -33,6 +26,35 @@ def step1_entity_recognition(query: str, graph_id: str = None):
     except Exception:
         pass  # 避免日志记录影响主流程
 
+def _parse_entity(llm_res):
+    return None if llm_res['json_content']['entity'] == '' else llm_res['json_content']['entity']
+
+def step1_entity_recognition(query: str, graph_id: str = None):
+    """
+    Performs entity recognition on the given query.
+    """
+    entity_map = _list_entity_map(graph_id)
+    prompt = get_llm_re_entity_prompt(query, entity_map.keys())
+
+    llm_res = quick_call(prompt, return_json=True)
+    entity = _parse_entity(llm_res)
+
+    # 记录实体识别日志
+    _log_entity_recognition(query, entity_map, entity, graph_id)
+    return entity
+
+async def astep1_entity_recognition(query: str, graph_id: str = None):
+    """
+    Async variant of step1_entity_recognition.
+    The blocking Neo4j driver call runs in a worker thread.
+    """
+    entity_map = await asyncio.to_thread(_list_entity_map, graph_id)
+    prompt = get_llm_re_entity_prompt(query, entity_map.keys())
+
+    llm_res = await aquick_call(prompt, return_json=True)
+    entity = _parse_entity(llm_res)
+
+    _log_entity_recognition(query, entity_map, entity, graph_id)
     return entity
 
 def step2_get_subgraph(entity: str, graph_id: str = None):
@@ -44,14 +66,31 @@ def step2_get_subgraph(entity: str, graph_id: str = None):
     entity_path = [item for item in entity_path if '->' in item]
     return entity_path
 
-def step3_qa_with_llm(query: str, entity_path: str):
+async def astep2_get_subgraph(entity: str, graph_id: str = None):
+    """
+    Async variant of step2_get_subgraph.
+    """
+    return await asyncio.to_thread(step2_get_subgraph, entity, graph_id)
+
+def step3_qa_with_llm(query: str, entity_path):
     """
     Answers the query based on the provided subgraph.
+    entity_path: list of paths, or paths already joined into text
     Returns: dict with 'answer' and 'referenced_paths'
     """
-    prompt = get_llm_qa_prompt(query, entity_path)
+    prompt = get_llm_qa_prompt(query, format_paths(entity_path))
     llm_res = quick_call(prompt, return_json=True)
     return llm_res['json_content']
-    
-    
 
+async def astep3_qa_with_llm(query: str, entity_path, center_entity: str = None):
+    """
+    Async variant of step3_qa_with_llm.
+    Results are cached per (query, paths); concurrent misses are
+    micro-batched into a single abatch request.
+    """
+    entity_path = format_paths(entity_path)
+    llm_res = await get_qa_cache().get_or_compute(
+        query, entity_path, center_entity,
+        lambda: get_qa_batcher().submit(query, entity_path)
+    )
+    return llm_res['json_content']
@@ -14,6 +14,15 @@ def get_llm_re_entity_prompt(query, entity_list) -> str:
     return llm_re_entity_prompt
 
 
+def format_paths(paths) -> str:
+    """将路径列表格式化为每行一条的文本；已是字符串时原样返回。
+    相比 str(list)，省去引号、逗号与转义字符，减少提示词 token。
+    """
+    if isinstance(paths, str):
+        return paths
+    return "\n".join(paths)
+
+
 def get_llm_qa_prompt(query, paths) -> str:
     llm_qa_prompt = f"""
 你是一个钢铁行业知识回答机器人，你负责专业的回答用户提问的问题。
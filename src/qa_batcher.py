@@ -0,0 +1,138 @@
+"""问答请求微批处理模块
+
+将并发到达的问答请求在一个很短的时间窗口内聚合，
+通过 LangChain 的 abatch 一次性发出，摊薄单次调用开销。
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from llm_call import get_llm_service
+from prompts import get_llm_qa_prompt
+
+logger = logging.getLogger(__name__)
+
+
+class QABatcher:
+    """
+    问答微批处理器
+
+    每个请求向队列放入 (prompt, Future)，后台协程最多聚合 max_batch 个请求，
+    或等待 max_wait_ms 毫秒后提交一批，并将结果逐个回填到对应的 Future。
+    """
+
+    def __init__(self, max_batch: int = 8, max_wait_ms: float = 25):
+        """
+        Args:
+            max_batch: 单批最多包含的请求数
+            max_wait_ms: 收集一批请求的最长等待时间（毫秒）
+        """
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.service = get_llm_service()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        """启动后台收集协程（需在事件循环中调用，可重复调用）"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台协程：已入队的请求照常提交并等待完成，停止后才到达的请求以异常结束"""
+        if self._worker is not None:
+            # 以 None 作为停止信号，收集协程处理完信号之前的请求后退出
+            if not self._worker.done():
+                self._queue.put_nowait(None)
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+        while self._queue is not None and not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None and not item[1].done():
+                item[1].set_exception(RuntimeError("QABatcher stopped"))
+
+    async def submit(self, query: str, entity_path: str) -> Dict[str, Any]:
+        """提交一个问答请求并等待结果，返回与 LLMCallService.call_llm_json 相同结构的字典"""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((get_llm_qa_prompt(query, entity_path), future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        batch: List[Tuple[str, asyncio.Future]] = []
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is None:
+                    return
+                batch = [item]
+                stopping = False
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+                # 批次在独立任务中执行，收集协程可立即开始聚合下一批
+                task = asyncio.create_task(self._dispatch(batch))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+                batch = []
+                if stopping:
+                    return
+        except asyncio.CancelledError:
+            # 被外部取消时，已取出但尚未提交的请求以异常结束，避免调用方永久等待
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("QABatcher stopped"))
+            raise
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        prompts = [prompt for prompt, _ in batch]
+        try:
+            results = await self.service.abatch_llm_json(prompts)
+        except Exception as e:
+            logger.error(f"QA batch failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+# 全局单例
+_qa_batcher: Optional[QABatcher] = None
+
+
+def get_qa_batcher() -> QABatcher:
+    """
+    获取全局问答微批处理器实例
+
+    Returns:
+        QABatcher 实例
+    """
+    global _qa_batcher
+    if _qa_batcher is None:
+        _qa_batcher = QABatcher()
+    return _qa_batcher
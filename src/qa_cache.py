@@ -0,0 +1,228 @@
+"""问答结果缓存模块
+
+问答调用对 (query, paths) 是确定性的，重复或近似重复的提问无需再次调用大模型。
+两级缓存：
+- 精确匹配：sha256(query + paths) 命中直接返回
+- 语义匹配：在同一中心实体与同一路径集合下，查询向量余弦相似度超过阈值即视为命中
+
+配置 REDIS_URL 时两级缓存均存放在 Redis 中，多个 worker 进程共享命中。
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from shared_cache import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class QACache:
+    """
+    问答结果的两级缓存（进程内，或配置 REDIS_URL 时使用 Redis）
+    """
+
+    def __init__(self,
+                 ttl: float = 24 * 3600,
+                 similarity_threshold: float = 0.95,
+                 max_entries: int = 1024,
+                 embed_model: Optional[str] = None,
+                 enable_semantic: Optional[bool] = None):
+        """
+        Args:
+            ttl: 缓存有效期（秒）
+            similarity_threshold: 语义命中的余弦相似度阈值
+            max_entries: 精确缓存与每个语义分区的最大条目数
+            embed_model: 语义匹配使用的 sentence-transformers 模型名
+            enable_semantic: 是否启用语义匹配，默认读取环境变量 QA_CACHE_SEMANTIC
+        """
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.embed_model = embed_model or os.getenv("QA_CACHE_EMBED_MODEL", "BAAI/bge-small-zh-v1.5")
+        if enable_semantic is None:
+            enable_semantic = os.getenv("QA_CACHE_SEMANTIC", "1") != "0"
+        self.enable_semantic = enable_semantic
+
+        self._lock = threading.Lock()
+        self._exact: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # 语义分区：context_key -> [(归一化向量, 结果, 过期时间)]
+        self._semantic: Dict[str, List[Tuple[np.ndarray, Dict[str, Any], float]]] = {}
+        self._encoder = None
+        # 模型加载耗时较长，单独加锁，避免阻塞缓存查找
+        self._encoder_lock = threading.Lock()
+
+    @staticmethod
+    def _hash(*parts: str) -> str:
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def _get_encoder(self):
+        if self._encoder is None and self.enable_semantic:
+            # 双重检查：冷启动时并发的未命中只加载一份模型
+            with self._encoder_lock:
+                if self._encoder is None and self.enable_semantic:
+                    try:
+                        from sentence_transformers import SentenceTransformer
+                        self._encoder = SentenceTransformer(self.embed_model)
+                    except Exception as e:
+                        logger.warning(f"Semantic QA cache disabled, failed to load '{self.embed_model}': {e}")
+                        self.enable_semantic = False
+        return self._encoder
+
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        encoder = self._get_encoder()
+        if encoder is None:
+            return None
+        return np.asarray(encoder.encode(query, normalize_embeddings=True), dtype=np.float32)
+
+    def _get_exact(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._exact.get(key)
+            if item is None:
+                return None
+            expires_at, result = item
+            if expires_at < time.time():
+                del self._exact[key]
+                return None
+            self._exact.move_to_end(key)
+            return result
+
+    def _get_semantic(self, context_key: str, vector: np.ndarray) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            now = time.time()
+            entries = [e for e in self._semantic.get(context_key, []) if e[2] >= now]
+            self._semantic[context_key] = entries
+            if not entries:
+                return None
+            scores = np.stack([e[0] for e in entries]) @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.similarity_threshold:
+                return entries[best][1]
+            return None
+
+    def _set(self, key: str, context_key: str, vector: Optional[np.ndarray], result: Dict[str, Any]) -> None:
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._exact[key] = (expires_at, result)
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_entries:
+                self._exact.popitem(last=False)
+
+            if vector is not None:
+                entries = self._semantic.setdefault(context_key, [])
+                entries.append((vector, result, expires_at))
+                del entries[:-self.max_entries]
+
+    async def _aget_exact(self, key: str) -> Optional[Dict[str, Any]]:
+        redis = get_redis()
+        if redis is None:
+            return self._get_exact(key)
+        try:
+            value = await redis.get(f"qa:exact:{key}")
+        except Exception as e:
+            logger.warning(f"Redis QA cache read failed: {e}")
+            return None
+        return json.loads(value) if value else None
+
+    async def _aget_semantic(self, context_key: str, vector: np.ndarray) -> Optional[Dict[str, Any]]:
+        redis = get_redis()
+        if redis is None:
+            return self._get_semantic(context_key, vector)
+        try:
+            values = await redis.lrange(f"qa:sem:{context_key}", 0, -1)
+        except Exception as e:
+            logger.warning(f"Redis QA cache read failed: {e}")
+            return None
+        if not values:
+            return None
+        entries = [json.loads(v) for v in values]
+        matrix = np.stack([np.frombuffer(base64.b64decode(e["v"]), dtype=np.float32) for e in entries])
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        if scores[best] >= self.similarity_threshold:
+            return entries[best]["r"]
+        return None
+
+    async def _aset(self, key: str, context_key: str, vector: Optional[np.ndarray], result: Dict[str, Any]) -> None:
+        redis = get_redis()
+        if redis is None:
+            self._set(key, context_key, vector, result)
+            return
+        ttl = int(self.ttl)
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.setex(f"qa:exact:{key}", ttl, json.dumps(result, ensure_ascii=False))
+                if vector is not None:
+                    sem_key = f"qa:sem:{context_key}"
+                    entry = {"v": base64.b64encode(vector.tobytes()).decode("ascii"), "r": result}
+                    pipe.rpush(sem_key, json.dumps(entry, ensure_ascii=False))
+                    pipe.ltrim(sem_key, -self.max_entries, -1)
+                    pipe.expire(sem_key, ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Redis QA cache write failed: {e}")
+
+    async def get_or_compute(self,
+                             query: str,
+                             entity_path: str,
+                             center_entity: Optional[str],
+                             compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        先查缓存，未命中时调用 compute 并缓存成功的结果
+
+        Args:
+            query: 用户查询
+            entity_path: 提供给大模型的路径文本
+            center_entity: 中心实体，语义匹配只在相同实体与路径下进行
+            compute: 未命中时调用的协程函数，返回 call_llm_json 结构的字典
+
+        Returns:
+            call_llm_json 结构的结果字典
+        """
+        paths_hash = self._hash(entity_path)
+        key = self._hash(query, paths_hash)
+        context_key = self._hash(center_entity or "", paths_hash)
+
+        result = await self._aget_exact(key)
+        if result is not None:
+            return result
+
+        vector = None
+        if self.enable_semantic:
+            # 向量编码为 CPU 密集操作，放到线程中执行
+            vector = await asyncio.to_thread(self._embed, query)
+            if vector is not None:
+                result = await self._aget_semantic(context_key, vector)
+                if result is not None:
+                    await self._aset(key, context_key, None, result)
+                    return result
+
+        result = await compute()
+        if result.get("status") == "success":
+            await self._aset(key, context_key, vector, result)
+        return result
+
+
+# 全局单例
+_qa_cache: Optional[QACache] = None
+
+
+def get_qa_cache() -> QACache:
+    """
+    获取全局问答缓存实例
+
+    Returns:
+        QACache 实例
+    """
+    global _qa_cache
+    if _qa_cache is None:
+        _qa_cache = QACache()
+    return _qa_cache
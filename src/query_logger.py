@@ -7,11 +7,15 @@
 - LLM 回答
 - 参考的路径
 - 时间戳
+
+在事件循环中调用 start() 后，日志先进入内存队列，由单个后台协程批量写入文件，
+log_query 不再阻塞调用方；未启动时按原方式同步写入。
 """
+import asyncio
 import json
 import os
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 import logging
 
 # 配置日志
@@ -27,12 +31,13 @@ class QueryLogger:
     查询日志记录器
     """
 
-    def __init__(self, log_dir: str = "logs"):
+    def __init__(self, log_dir: str = "logs", max_batch: int = 100):
         """
         初始化日志记录器
 
         Args:
             log_dir: 日志文件存储目录
+            max_batch: 后台协程单次写入的最大记录数
         """
         self.log_dir = log_dir
         os.makedirs(log_dir, exist_ok=True)
@@ -42,6 +47,74 @@ class QueryLogger:
         self.json_log_file = os.path.join(log_dir, f"queries_{today}.jsonl")
         self.text_log_file = os.path.join(log_dir, f"queries_{today}.log")
 
+        # 异步批量写入：队列元素为 (JSON 行 或 None, 文本块)，None 元素表示停止
+        self.max_batch = max(1, int(max_batch))
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """启动后台写入协程（需在事件循环中调用）"""
+        if self._writer is None or self._writer.done():
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue()
+            self._writer = asyncio.create_task(self._run_writer())
+
+    async def stop(self) -> None:
+        """写完队列中剩余的日志后停止后台协程"""
+        if self._writer is None:
+            return
+        self._queue.put_nowait(None)
+        await self._writer
+        self._writer = None
+        self._loop = None
+
+    async def _run_writer(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            stop = None in batch
+            records = [item for item in batch if item is not None]
+            if records:
+                # 写入期间新到的日志继续堆积在队列中，下一轮一并写入
+                await asyncio.to_thread(self._write_batch, records)
+            if stop:
+                return
+
+    def _enqueue(self, json_line: Optional[str], text_block: str) -> None:
+        item = (json_line, text_block)
+        if self._writer is None or self._writer.done():
+            self._write_batch([item])
+            return
+        try:
+            in_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            in_loop = False
+        if in_loop:
+            self._queue.put_nowait(item)
+        else:
+            # 来自工作线程的日志，交给事件循环线程入队
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    def _write_batch(self, records: List[Tuple[Optional[str], str]]) -> None:
+        json_lines = [json_line for json_line, _ in records if json_line is not None]
+        if json_lines:
+            # 写入 JSONL 文件（每行一个 JSON 对象，方便流式读取和分析）
+            try:
+                with open(self.json_log_file, 'a', encoding='utf-8') as f:
+                    f.write("".join(json_lines))
+            except Exception as e:
+                logger.error(f"Failed to write JSON log: {e}")
+
+        # 写入文本日志（人类可读）
+        try:
+            with open(self.text_log_file, 'a', encoding='utf-8') as f:
+                f.write("".join(text_block for _, text_block in records))
+        except Exception as e:
+            logger.error(f"Failed to write text log: {e}")
+
     def log_query(self,
                   query: str,
                   center_entity: Optional[str],
@@ -83,46 +156,35 @@ class QueryLogger:
             "success": error is None
         }
 
-        # 写入 JSONL 文件（每行一个 JSON 对象，方便流式读取和分析）
-        try:
-            with open(self.json_log_file, 'a', encoding='utf-8') as f:
-                json.dump(log_entry, f, ensure_ascii=False)
-                f.write('\n')
-        except Exception as e:
-            logger.error(f"Failed to write JSON log: {e}")
+        lines = ["=" * 80 + "\n",
+                 f"时间: {timestamp.strftime('%Y-%m-%d %H:%M:%S')}\n",
+                 f"图谱ID: {graph_id}\n",
+                 f"查询: {query}\n",
+                 f"识别实体: {center_entity}\n",
+                 f"检索路径数: {len(all_paths) if all_paths else 0}\n"]
 
-        # 写入文本日志（人类可读）
-        try:
-            with open(self.text_log_file, 'a', encoding='utf-8') as f:
-                f.write("=" * 80 + "\n")
-                f.write(f"时间: {timestamp.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"图谱ID: {graph_id}\n")
-                f.write(f"查询: {query}\n")
-                f.write(f"识别实体: {center_entity}\n")
-                f.write(f"检索路径数: {len(all_paths) if all_paths else 0}\n")
+        if all_paths and len(all_paths) > 0:
+            lines.append(f"\n检索到的路径（前5条）:\n")
+            for i, path in enumerate(all_paths[:5], 1):
+                lines.append(f"  {i}. {path}\n")
 
-                if all_paths and len(all_paths) > 0:
-                    f.write(f"\n检索到的路径（前5条）:\n")
-                    for i, path in enumerate(all_paths[:5], 1):
-                        f.write(f"  {i}. {path}\n")
+        lines.append(f"\n答案: {answer}\n")
+        lines.append(f"参考路径数: {len(referenced_paths) if referenced_paths else 0}\n")
 
-                f.write(f"\n答案: {answer}\n")
-                f.write(f"参考路径数: {len(referenced_paths) if referenced_paths else 0}\n")
+        if referenced_paths and len(referenced_paths) > 0:
+            lines.append(f"\n参考的路径:\n")
+            for i, path in enumerate(referenced_paths, 1):
+                lines.append(f"  {i}. {path}\n")
 
-                if referenced_paths and len(referenced_paths) > 0:
-                    f.write(f"\n参考的路径:\n")
-                    for i, path in enumerate(referenced_paths, 1):
-                        f.write(f"  {i}. {path}\n")
+        if execution_time:
+            lines.append(f"\n执行时间: {execution_time:.2f}秒\n")
 
-                if execution_time:
-                    f.write(f"\n执行时间: {execution_time:.2f}秒\n")
+        if error:
+            lines.append(f"\n错误: {error}\n")
 
-                if error:
-                    f.write(f"\n错误: {error}\n")
+        lines.append("=" * 80 + "\n\n")
 
-                f.write("=" * 80 + "\n\n")
-        except Exception as e:
-            logger.error(f"Failed to write text log: {e}")
+        self._enqueue(json.dumps(log_entry, ensure_ascii=False) + "\n", "".join(lines))
 
         logger.info(f"Query logged: '{query}' -> Entity: {center_entity}")
         return log_entry
@@ -142,19 +204,16 @@ class QueryLogger:
             graph_id: 图谱ID
         """
         timestamp = datetime.now()
-        try:
-            with open(self.text_log_file, 'a', encoding='utf-8') as f:
-                f.write("-" * 40 + "\n")
-                f.write(f"时间: {timestamp.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"步骤: 实体识别\n")
-                f.write(f"图谱ID: {graph_id}\n")
-                f.write(f"查询: {query}\n")
-                f.write(f"候选实体数: {candidates_count}\n")
-                f.write(f"识别实体: {selected_entity}\n")
-                f.write("-" * 40 + "\n\n")
-        except Exception as e:
-            logger.error(f"Failed to write entity recognition log: {e}")
-            
+        text_block = ("-" * 40 + "\n"
+                      f"时间: {timestamp.strftime('%Y-%m-%d %H:%M:%S')}\n"
+                      f"步骤: 实体识别\n"
+                      f"图谱ID: {graph_id}\n"
+                      f"查询: {query}\n"
+                      f"候选实体数: {candidates_count}\n"
+                      f"识别实体: {selected_entity}\n"
+                      + "-" * 40 + "\n\n")
+        self._enqueue(None, text_block)
+
         logger.info(f"Entity recognition logged: '{query}' -> {selected_entity} (from {candidates_count} candidates)")
 
     def get_statistics(self) -> Dict[str, Any]:
@@ -0,0 +1,47 @@
+"""多进程共享缓存连接
+
+多 worker 部署（gunicorn/uvicorn --workers）时，进程内缓存无法在 worker 之间共享。
+配置环境变量 REDIS_URL 后，问答缓存与可视化缓存改为存放在 Redis 中；
+未配置时返回 None，调用方回退到进程内缓存。
+"""
+import logging
+import os
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+_redis: Optional["aioredis.Redis"] = None
+_initialized = False
+
+
+def get_redis() -> Optional["aioredis.Redis"]:
+    """
+    获取全局 redis.asyncio 客户端
+
+    Returns:
+        redis.asyncio.Redis 实例；未配置 REDIS_URL 或未安装 redis 时返回 None
+    """
+    global _redis, _initialized
+    if not _initialized:
+        _initialized = True
+        url = os.getenv("REDIS_URL")
+        if url:
+            try:
+                import redis.asyncio as aioredis
+                _redis = aioredis.from_url(url)
+                logger.info("✅ Shared cache uses Redis")
+            except ImportError:
+                logger.warning("REDIS_URL is set but the redis package is not installed, using in-process caches")
+    return _redis
+
+
+async def close_redis() -> None:
+    """关闭全局 Redis 连接"""
+    global _redis, _initialized
+    if _redis is not None:
+        await _redis.aclose()
+    _redis = None
+    _initialized = False